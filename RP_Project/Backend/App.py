@@ -1,19 +1,58 @@
 from flask import Flask, request, jsonify, send_file
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import multiprocessing
 import os
-from datetime import datetime
+import atexit
+import uuid
+import hashlib
+import queue
+import threading
+import time
 import logging
-from Backend.Database import Base, User, UploadSession, AudioFile, ProcessingJob, ProcessingResult, RecordingSession, SystemLog
+import orjson
+from Backend.Database import create_db_engine, utcnow, Base, User, UploadSession, AudioFile, ProcessingJob, RecordingSession, SystemLog
 from Backend.Processing.Convert import convert_mp3_to_wav, get_audio_metadata
-from Backend.Processing.Processing import process_audio_pipeline
+from Backend.Processing.Processing import process_audio_pipeline, set_fft_threads, fft_threads_per_worker
 from Backend.Config import Config
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import FileTarget
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
 import traceback
 
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson, used by jsonify and request.json"""
+    
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.OPTIONS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=self.OPTIONS),
+            mimetype='application/json'
+        )
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
+app.json = ORJSONProvider(app)
+
+# Config values read on the upload hot path, bound once
+UPLOAD_FOLDER = app.config['UPLOAD_FOLDER']
+MAX_LEN = app.config['MAX_CONTENT_LENGTH']
+ALLOWED_EXT = frozenset(app.config['ALLOWED_EXTENSIONS'])
 
 # Enable CORS
 CORS(app)
@@ -26,32 +65,257 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Database setup
-engine = create_engine(app.config['DATABASE_URL'], echo=False)
+engine = create_db_engine(
+    app.config['DATABASE_URL'],
+    echo=False,
+    **app.config['SQLALCHEMY_ENGINE_OPTIONS']
+)
 SessionLocal = sessionmaker(bind=engine)
 
+@contextmanager
+def db_session():
+    """Provide a transactional session that is always rolled back on error and closed"""
+    session = SessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+# System log rows are queued by request handlers and written by one
+# background thread in batches, keeping the DB off the request path
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 0.1  # seconds
+log_queue = queue.Queue()
+
+def log_event(level, message, module=None):
+    """Queue a SystemLog row for the background writer"""
+    log_queue.put({
+        'log_level': level,
+        'message': message,
+        'module': module,
+        'timestamp': utcnow()
+    })
+
+def write_system_logs(rows):
+    """Insert a batch of SystemLog rows in one transaction"""
+    try:
+        with db_session() as session:
+            session.bulk_insert_mappings(SystemLog, rows)
+    except Exception as e:
+        logger.error(f"System log write error: {str(e)}")
+
+def flush_system_logs():
+    """Write whatever is still queued; registered to run at interpreter exit"""
+    rows = []
+    while True:
+        try:
+            rows.append(log_queue.get_nowait())
+        except queue.Empty:
+            break
+    if rows:
+        write_system_logs(rows)
+
+def system_log_writer():
+    """Drain log_queue, committing up to LOG_BATCH_SIZE rows per transaction"""
+    while True:
+        rows = [log_queue.get()]
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while len(rows) < LOG_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(log_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        write_system_logs(rows)
+
 def init_db():
     """Initialize database tables"""
     try:
+        # Tables come from the ORM models; SQL/Schema.sql is reference only.
+        # create_all never alters existing tables: upgrade those with SQL/Migrations/
         Base.metadata.create_all(bind=engine)
         logger.info("Database initialized successfully")
-        
-        # Load schema from file if exists
-        schema_file = 'SQL/Schema.sql'
-        if os.path.exists(schema_file):
-            with open(schema_file, 'r') as f:
-                sql_commands = f.read()
-                # Execute SQL if needed
-        
         return True
     except Exception as e:
         logger.error(f"Database initialization error: {str(e)}")
         return False
 
-# Initialize database on startup
-if not os.path.exists('database'):
-    os.makedirs('database')
+# Initialize directories and database on startup. When this file is run directly
+# (python -m Backend.App), spawned processing workers re-import it as __mp_main__;
+# they only need the pipeline, so they skip the app's startup side effects.
+if __name__ != '__mp_main__':
+    Config.ensure_dirs()
+    
+    init_db()
+    
+    threading.Thread(target=system_log_writer, name='system-log-writer', daemon=True).start()
+    atexit.register(flush_system_logs)
+
+# Worker processes for audio processing jobs, created on the first /process request
+processing_executor = None
+processing_executor_lock = threading.Lock()
 
-init_db()
+def get_processing_executor():
+    """
+    Return the processing pool, creating it on first use. Workers are spawned rather
+    than forked: the log writer thread is running and the engine pool is open, and a
+    forked child could inherit a held lock or share a pooled connection. Spawned workers
+    start from a fresh interpreter and never handle requests, so they never build a pool.
+    """
+    global processing_executor
+    with processing_executor_lock:
+        if processing_executor is None:
+            processing_executor = ProcessPoolExecutor(
+                max_workers=app.config['PROCESSING_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=set_fft_threads,
+                # Every server process runs a pool like this one, so share the cores among all
+                initargs=(fft_threads_per_worker(
+                    app.config['SERVER_WORKERS'] * app.config['PROCESSING_WORKERS']
+                ),)
+            )
+        return processing_executor
+
+def file_extension(filename):
+    """Return the lowercased extension of filename, or '' if it has none"""
+    dot = filename.rfind('.')
+    return filename[dot + 1:].lower() if dot != -1 else ''
+
+# Block size used when streaming request bodies to disk
+STREAM_CHUNK_SIZE = 1 << 20  # 1MB
+
+def new_content_hasher():
+    """Hasher used to fingerprint uploaded audio for deduplication"""
+    return hashlib.blake2b(digest_size=16)
+
+def stream_to_file(stream, filepath, max_bytes=None):
+    """
+    Copy a stream to disk in fixed-size blocks, hashing as it goes
+    
+    Returns:
+        tuple: (number of bytes written, hex content hash)
+    """
+    total = 0
+    hasher = new_content_hasher()
+    with open(filepath, 'wb', buffering=STREAM_CHUNK_SIZE) as f:
+        while chunk := stream.read(STREAM_CHUNK_SIZE):
+            total += len(chunk)
+            if max_bytes is not None and total > max_bytes:
+                raise RequestEntityTooLarge()
+            f.write(chunk)
+            hasher.update(chunk)
+    return total, hasher.hexdigest()
+
+class CountingFileTarget(FileTarget):
+    """FileTarget that tracks how many bytes it has written and their hash"""
+    
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        self.size = 0
+        self.hasher = new_content_hasher()
+    
+    def on_data_received(self, chunk):
+        super().on_data_received(chunk)
+        self.size += len(chunk)
+        self.hasher.update(chunk)
+
+def stream_multipart_to_file(filepath, max_bytes, field='file'):
+    """
+    Parse a multipart body on the fly, writing the file field straight to disk
+    
+    Returns:
+        tuple: (original filename, number of bytes written, hex content hash)
+    """
+    target = CountingFileTarget(filepath)
+    parser = StreamingFormDataParser(headers=request.headers)
+    parser.register(field, target)
+    
+    total = 0
+    while chunk := request.stream.read(65536):
+        total += len(chunk)
+        if total > max_bytes:
+            raise RequestEntityTooLarge()
+        parser.data_received(chunk)
+    return target.multipart_filename, target.size, target.hasher.hexdigest()
+
+def remove_upload_file(filepath):
+    """Delete an upload that was rejected or only partially written, if it exists"""
+    if filepath and os.path.exists(filepath):
+        os.remove(filepath)
+
+def duplicate_upload_response(existing, metadata):
+    """Response for an upload whose content is already stored as `existing`"""
+    return jsonify({
+        'success': True,
+        'duplicate': True,
+        'file_id': existing.id,
+        'upload_session_id': existing.upload_session_id,
+        'metadata': metadata
+    }), 200
+
+def save_upload_records(filename, original_filename, filepath, ext, file_size, content_hash):
+    """
+    Create the UploadSession/AudioFile rows for a stored upload. If identical
+    content was uploaded before, the new copy is deleted and the existing
+    AudioFile is returned instead, so it is not stored or processed twice.
+    
+    Returns:
+        tuple: (JSON response, status code)
+    """
+    # Same bytes as any earlier copy, so this metadata also describes a duplicate
+    metadata = get_audio_metadata(filepath)
+    
+    try:
+        with db_session() as session:
+            existing = session.query(AudioFile).filter_by(content_hash=content_hash).first()
+            if existing:
+                os.remove(filepath)
+                return duplicate_upload_response(existing, metadata)
+            
+            upload_session = UploadSession(
+                filename=filename,
+                original_filename=original_filename,
+                file_size=file_size,
+                upload_timestamp=utcnow()
+            )
+            session.add(upload_session)
+            session.flush()
+            
+            audio_file = AudioFile(
+                upload_session_id=upload_session.id,
+                file_path=filepath,
+                format=ext,
+                duration=metadata.get('duration', 0),
+                sample_rate=metadata.get('sample_rate', 0),
+                content_hash=content_hash
+            )
+            session.add(audio_file)
+            session.flush()
+            
+            log_event('INFO', f"File uploaded: {filename}", 'upload')
+            
+            return jsonify({
+                'success': True,
+                'file_id': audio_file.id,
+                'upload_session_id': upload_session.id,
+                'metadata': metadata
+            }), 200
+    
+    except IntegrityError:
+        # A concurrent upload of the same content inserted first; db_session rolled back ours
+        with db_session() as session:
+            existing = session.query(AudioFile).filter_by(content_hash=content_hash).first()
+            if existing is None:
+                raise
+            os.remove(filepath)
+            return duplicate_upload_response(existing, metadata)
 
 # ==================== API ENDPOINTS ====================
 
@@ -61,12 +325,13 @@ def health_check():
     return jsonify({
         'status': 'running',
         'message': 'Speech Enhancement System Backend',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': utcnow().isoformat()
     }), 200
 
 @app.route('/upload', methods=['POST'])
 def upload_audio():
     """Upload audio file endpoint"""
+    filepath = None
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
@@ -76,77 +341,88 @@ def upload_audio():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        # Validate file size
-        if len(file.read()) > app.config['MAX_CONTENT_LENGTH']:
-            return jsonify({'error': 'File too large'}), 413
-        
-        file.seek(0)
+        ext = file_extension(file.filename)
+        if ext not in ALLOWED_EXT:
+            return jsonify({'error': 'File type not allowed'}), 400
         
         # Save file
-        if not os.path.exists(app.config['UPLOAD_FOLDER']):
-            os.makedirs(app.config['UPLOAD_FOLDER'])
-        
-        filename = f"{datetime.now().timestamp()}_{file.filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
+        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        file_size, content_hash = stream_to_file(file.stream, filepath)
         
-        # Get metadata
-        metadata = get_audio_metadata(filepath)
+        return save_upload_records(filename, file.filename, filepath, ext, file_size, content_hash)
+    
+    except RequestEntityTooLarge:
+        # Size limit is enforced by Werkzeug via MAX_CONTENT_LENGTH
+        raise
+    except Exception as e:
+        logger.error(f"Upload error: {str(e)}\n{traceback.format_exc()}")
+        remove_upload_file(filepath)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/stream', methods=['POST'])
+def upload_audio_stream():
+    """Upload audio file by streaming the request body to disk"""
+    filepath = None
+    try:
+        file_key = uuid.uuid4().hex
         
-        # Create database records
-        session = SessionLocal()
-        try:
-            upload_session = UploadSession(
-                filename=filename,
-                original_filename=file.filename,
-                file_size=os.path.getsize(filepath),
-                upload_timestamp=datetime.now()
-            )
-            session.add(upload_session)
-            session.commit()
+        if request.mimetype == 'multipart/form-data':
+            # Filename is only known once the part headers are parsed
+            filepath = os.path.join(UPLOAD_FOLDER, f"{file_key}.part")
+            original_filename, file_size, content_hash = stream_multipart_to_file(filepath, MAX_LEN)
+            ext = file_extension(original_filename or '')
+            if not original_filename or ext not in ALLOWED_EXT:
+                remove_upload_file(filepath)
+                if not original_filename:
+                    return jsonify({'error': 'No file provided'}), 400
+                return jsonify({'error': 'File type not allowed'}), 400
             
-            audio_file = AudioFile(
-                upload_session_id=upload_session.id,
-                file_path=filepath,
-                format=file.filename.split('.')[-1],
-                duration=metadata.get('duration', 0),
-                sample_rate=metadata.get('sample_rate', 0)
-            )
-            session.add(audio_file)
-            session.commit()
+            filename = f"{file_key}_{secure_filename(original_filename)}"
+            final_path = os.path.join(UPLOAD_FOLDER, filename)
+            os.replace(filepath, final_path)
+            filepath = final_path
+        else:
+            # Raw body: client passes the original name out of band
+            original_filename = request.headers.get('X-Filename') or request.args.get('filename')
+            if not original_filename:
+                return jsonify({'error': 'No filename provided'}), 400
             
-            return jsonify({
-                'success': True,
-                'file_id': audio_file.id,
-                'upload_session_id': upload_session.id,
-                'metadata': metadata
-            }), 200
-        finally:
-            session.close()
+            ext = file_extension(original_filename)
+            if ext not in ALLOWED_EXT:
+                return jsonify({'error': 'File type not allowed'}), 400
+            
+            filename = f"{file_key}_{secure_filename(original_filename)}"
+            filepath = os.path.join(UPLOAD_FOLDER, filename)
+            file_size, content_hash = stream_to_file(request.stream, filepath, MAX_LEN)
+        
+        return save_upload_records(filename, original_filename, filepath, ext, file_size, content_hash)
     
+    except RequestEntityTooLarge:
+        remove_upload_file(filepath)
+        return jsonify({'error': 'File too large'}), 413
     except Exception as e:
-        logger.error(f"Upload error: {str(e)}\n{traceback.format_exc()}")
+        logger.error(f"Stream upload error: {str(e)}\n{traceback.format_exc()}")
+        remove_upload_file(filepath)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/record', methods=['POST'])
 def init_recording():
     """Initialize recording session"""
     try:
-        session = SessionLocal()
-        try:
+        now = utcnow()
+        with db_session() as session:
             recording_session = RecordingSession(
-                start_time=datetime.now()
+                start_time=now
             )
             session.add(recording_session)
-            session.commit()
+            session.flush()
             
             return jsonify({
                 'success': True,
                 'recording_session_id': recording_session.id,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now.isoformat()
             }), 200
-        finally:
-            session.close()
     except Exception as e:
         logger.error(f"Recording init error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -160,26 +436,25 @@ def save_recording():
         
         audio_file = request.files['audio_data']
         recording_session_id = request.form.get('recording_session_id')
+        now = utcnow()
         
-        if not os.path.exists(app.config['UPLOAD_FOLDER']):
-            os.makedirs(app.config['UPLOAD_FOLDER'])
+        filename = f"recording_{uuid.uuid4().hex}.wav"
+        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        with open(filepath, 'wb') as f:
+            audio_file.save(f)
+            file_size = f.tell()
         
-        filename = f"recording_{datetime.now().timestamp()}.wav"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        audio_file.save(filepath)
-        
-        session = SessionLocal()
-        try:
+        with db_session() as session:
             metadata = get_audio_metadata(filepath)
             
             upload_session = UploadSession(
                 filename=filename,
                 original_filename=filename,
-                file_size=os.path.getsize(filepath),
-                upload_timestamp=datetime.now()
+                file_size=file_size,
+                upload_timestamp=now
             )
             session.add(upload_session)
-            session.commit()
+            session.flush()
             
             audio_obj = AudioFile(
                 upload_session_id=upload_session.id,
@@ -189,41 +464,91 @@ def save_recording():
                 sample_rate=metadata.get('sample_rate', 0)
             )
             session.add(audio_obj)
-            session.commit()
+            session.flush()
             
             if recording_session_id:
-                recording = session.query(RecordingSession).filter_by(
-                    id=recording_session_id
-                ).first()
+                recording = session.get(RecordingSession, recording_session_id)
                 if recording:
-                    recording.end_time = datetime.now()
+                    recording.end_time = now
                     recording.audio_file_id = audio_obj.id
-                    session.commit()
             
             return jsonify({
                 'success': True,
                 'file_id': audio_obj.id,
                 'metadata': metadata
             }), 200
-        finally:
-            session.close()
     
     except Exception as e:
         logger.error(f"Save recording error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def mark_job_failed(job_id, error_message):
+    """Record a processing job as failed so clients stop polling it"""
+    try:
+        with db_session() as session:
+            processing_job = session.get(ProcessingJob, job_id)
+            if processing_job:
+                processing_job.status = 'failed'
+                processing_job.end_time = utcnow()
+                processing_job.error_message = error_message
+        logger.error(f"Processing error for job {job_id}: {error_message}")
+    except Exception as e:
+        logger.error(f"Marking job {job_id} failed errored: {str(e)}")
+
+def save_processing_results(job_id, future):
+    """Persist pipeline results once a background processing job finishes"""
+    # A dead worker (BrokenProcessPool) or a cancelled job must not leave the job pending
+    if future.cancelled():
+        mark_job_failed(job_id, 'Processing was cancelled')
+        return
+    
+    error = future.exception()
+    if error is not None:
+        mark_job_failed(job_id, str(error) or type(error).__name__)
+        return
+    
+    results = future.result()
+    if not results.get('success', True):
+        mark_job_failed(job_id, results.get('error') or 'Processing failed')
+        return
+    
+    try:
+        with db_session() as session:
+            processing_job = session.get(ProcessingJob, job_id)
+            
+            # Save results; the serialized copy is what /results serves
+            metrics = {
+                'signal_power': results.get('signal_power'),
+                'noise_power': results.get('noise_power'),
+                'snr_input': results.get('snr_input'),
+                'wiener_gain': results.get('wiener_gain'),
+                'spectral_subtraction_factor': results.get('spectral_subtraction_factor'),
+                'spectral_distance': results.get('spectral_distance'),
+                'segmental_snr': results.get('segmental_snr'),
+                'processing_duration': results.get('processing_duration'),
+                'output_file_path': results.get('output_file_path')
+            }
+            for name, value in metrics.items():
+                setattr(processing_job, name, value)
+            processing_job.metrics_json = app.json.dumps(metrics)
+            
+            processing_job.status = 'completed'
+            processing_job.end_time = utcnow()
+    
+    except Exception as e:
+        logger.error(f"Saving results for job {job_id} failed: {str(e)}\n{traceback.format_exc()}")
+
 @app.route('/process', methods=['POST'])
 def process_audio():
-    """Start audio processing"""
+    """Queue audio processing; clients poll /process/<job_id>/status"""
     try:
         file_id = request.json.get('file_id')
         
         if not file_id:
             return jsonify({'error': 'No file_id provided'}), 400
         
-        session = SessionLocal()
-        try:
-            audio_file = session.query(AudioFile).filter_by(id=file_id).first()
+        with db_session() as session:
+            audio_file = session.get(AudioFile, file_id)
             
             if not audio_file:
                 return jsonify({'error': 'File not found'}), 404
@@ -231,62 +556,36 @@ def process_audio():
             # Create processing job
             processing_job = ProcessingJob(
                 audio_file_id=file_id,
-                status='processing',
-                start_time=datetime.now()
+                status='pending',
+                start_time=utcnow()
             )
             session.add(processing_job)
-            session.commit()
+            session.flush()
             
             job_id = processing_job.id
-            
-            # Process audio
-            try:
-                results = process_audio_pipeline(audio_file.file_path)
-                
-                # Save results
-                processing_result = ProcessingResult(
-                    processing_job_id=job_id,
-                    signal_power=results.get('signal_power'),
-                    noise_power=results.get('noise_power'),
-                    snr_input=results.get('snr_input'),
-                    wiener_gain=results.get('wiener_gain'),
-                    spectral_subtraction_factor=results.get('spectral_subtraction_factor'),
-                    spectral_distance=results.get('spectral_distance'),
-                    segmental_snr=results.get('segmental_snr'),
-                    processing_duration=results.get('processing_duration'),
-                    output_file_path=results.get('output_file_path')
-                )
-                session.add(processing_result)
-                
-                processing_job.status = 'completed'
-                processing_job.end_time = datetime.now()
-                session.commit()
-                
-                return jsonify({
-                    'success': True,
-                    'job_id': job_id,
-                    'status': 'completed',
-                    'results': {
-                        'signal_power': results.get('signal_power'),
-                        'noise_power': results.get('noise_power'),
-                        'snr_input': results.get('snr_input'),
-                        'wiener_gain': results.get('wiener_gain'),
-                        'spectral_subtraction_factor': results.get('spectral_subtraction_factor'),
-                        'spectral_distance': results.get('spectral_distance'),
-                        'segmental_snr': results.get('segmental_snr'),
-                        'processing_duration': results.get('processing_duration')
-                    }
-                }), 200
-            
-            except Exception as e:
-                processing_job.status = 'failed'
-                processing_job.end_time = datetime.now()
-                session.commit()
-                logger.error(f"Processing error: {str(e)}")
-                return jsonify({'error': str(e)}), 500
+            file_path = audio_file.file_path
+        
+        # Run the CPU-bound pipeline in a worker process, off the request thread
+        try:
+            future = get_processing_executor().submit(process_audio_pipeline, file_path)
+        except Exception as e:
+            mark_job_failed(job_id, str(e))
+            return jsonify({'error': str(e)}), 500
+        
+        # Only move pending -> processing; a job that already finished keeps its final status
+        with db_session() as session:
+            session.query(ProcessingJob).filter_by(id=job_id, status='pending').update(
+                {'status': 'processing'}
+            )
+        future.add_done_callback(partial(save_processing_results, job_id))
         
-        finally:
-            session.close()
+        log_event('INFO', f"Processing job {job_id} queued for file {file_id}", 'process')
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'processing'
+        }), 202
     
     except Exception as e:
         logger.error(f"Process endpoint error: {str(e)}")
@@ -296,9 +595,8 @@ def process_audio():
 def get_processing_status(job_id):
     """Get processing job status"""
     try:
-        session = SessionLocal()
-        try:
-            job = session.query(ProcessingJob).filter_by(id=job_id).first()
+        with db_session() as session:
+            job = session.get(ProcessingJob, job_id)
             
             if not job:
                 return jsonify({'error': 'Job not found'}), 404
@@ -307,10 +605,9 @@ def get_processing_status(job_id):
                 'job_id': job.id,
                 'status': job.status,
                 'start_time': job.start_time.isoformat() if job.start_time else None,
-                'end_time': job.end_time.isoformat() if job.end_time else None
+                'end_time': job.end_time.isoformat() if job.end_time else None,
+                'error_message': job.error_message
             }), 200
-        finally:
-            session.close()
     
     except Exception as e:
         logger.error(f"Status check error: {str(e)}")
@@ -320,29 +617,29 @@ def get_processing_status(job_id):
 def get_results(job_id):
     """Get processing results"""
     try:
-        session = SessionLocal()
-        try:
-            result = session.query(ProcessingResult).filter_by(
-                processing_job_id=job_id
-            ).first()
+        with db_session() as session:
+            job = session.get(ProcessingJob, job_id)
             
-            if not result:
+            if not job or job.status != 'completed':
                 return jsonify({'error': 'Results not found'}), 404
             
+            if job.metrics_json:
+                # Splice job_id into the JSON stored at write time
+                body = f'{{"job_id":{job_id},{job.metrics_json[1:]}'
+                return app.response_class(body, mimetype='application/json'), 200
+            
             return jsonify({
                 'job_id': job_id,
-                'signal_power': result.signal_power,
-                'noise_power': result.noise_power,
-                'snr_input': result.snr_input,
-                'wiener_gain': result.wiener_gain,
-                'spectral_subtraction_factor': result.spectral_subtraction_factor,
-                'spectral_distance': result.spectral_distance,
-                'segmental_snr': result.segmental_snr,
-                'processing_duration': result.processing_duration,
-                'output_file_path': result.output_file_path
+                'signal_power': job.signal_power,
+                'noise_power': job.noise_power,
+                'snr_input': job.snr_input,
+                'wiener_gain': job.wiener_gain,
+                'spectral_subtraction_factor': job.spectral_subtraction_factor,
+                'spectral_distance': job.spectral_distance,
+                'segmental_snr': job.segmental_snr,
+                'processing_duration': job.processing_duration,
+                'output_file_path': job.output_file_path
             }), 200
-        finally:
-            session.close()
     
     except Exception as e:
         logger.error(f"Results retrieval error: {str(e)}")
@@ -352,25 +649,23 @@ def get_results(job_id):
 def download_file(file_id):
     """Download processed audio file"""
     try:
-        session = SessionLocal()
-        try:
-            result = session.query(ProcessingResult).filter_by(
-                processing_job_id=file_id
-            ).first()
+        with db_session() as session:
+            job = session.get(ProcessingJob, file_id)
             
-            if not result or not result.output_file_path:
+            if not job or not job.output_file_path:
                 return jsonify({'error': 'File not found'}), 404
             
-            if not os.path.exists(result.output_file_path):
+            if not os.path.exists(job.output_file_path):
                 return jsonify({'error': 'File not found on disk'}), 404
             
+            log_event('INFO', f"Download of job {file_id} output", 'download')
+            
             return send_file(
-                result.output_file_path,
+                os.path.abspath(job.output_file_path),
                 as_attachment=True,
+                conditional=True,
                 download_name='enhanced_audio.wav'
             )
-        finally:
-            session.close()
     
     except Exception as e:
         logger.error(f"Download error: {str(e)}")
@@ -381,6 +676,11 @@ def not_found(error):
     """Handle 404 errors"""
     return jsonify({'error': 'Not found'}), 404
 
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(error):
+    """Handle uploads larger than MAX_CONTENT_LENGTH"""
+    return jsonify({'error': 'File too large'}), 413
+
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors"""
@@ -388,6 +688,7 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
+    # Development server only; in production run gunicorn -c gunicorn.conf.py Backend.App:app
     logger.info("Starting Speech Enhancement System Backend")
     app.run(
         host='0.0.0.0',
@@ -1,27 +1,39 @@
 import os
+from functools import cache
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables once; all settings below read this snapshot
 load_dotenv()
+_ENV = os.environ.copy()
 
 class Config:
     """Configuration for Speech Enhancement System"""
+    __slots__ = ()  # settings are class attributes; instances carry no __dict__
     
     # Flask Configuration
-    SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
+    SECRET_KEY = _ENV.get('SECRET_KEY', 'your-secret-key-change-in-production')
     DEBUG = False
     TESTING = False
     
     # Database Configuration
-    DATABASE_URL = os.getenv(
+    DATABASE_URL = _ENV.get(
         'DATABASE_URL',
         'sqlite:///database/speech_enhancement.db'
     )
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 1800,  # seconds
+        'pool_pre_ping': True,
+        'pool_use_lifo': True
+    }
     
     # Upload Configuration
-    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
-    MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
-    ALLOWED_EXTENSIONS = {'mp3', 'wav', 'flac', 'ogg', 'm4a'}
+    UPLOAD_FOLDER = _ENV.get('UPLOAD_FOLDER', 'uploads')
+    MAX_FILE_SIZE = int(_ENV.get('MAX_FILE_SIZE', 100 * 1024 * 1024))  # 100MB max file size
+    MAX_CONTENT_LENGTH = MAX_FILE_SIZE  # lets Werkzeug reject oversized bodies before reading them
+    ALLOWED_EXTENSIONS = frozenset({'mp3', 'wav', 'flac', 'ogg', 'm4a'})
     
     # Processing Configuration
     SAMPLE_RATE = 16000  # Hz
@@ -31,51 +43,66 @@ class Config:
     
     # Processing Paths
     SCHEMA_FILE = 'SQL/Schema.sql'  # Database schema file
-    OUTPUT_FOLDER = os.getenv('OUTPUT_FOLDER', 'output')
-    TEMP_FOLDER = os.getenv('TEMP_FOLDER', 'temp')
+    OUTPUT_FOLDER = _ENV.get('OUTPUT_FOLDER', 'output')
+    TEMP_FOLDER = _ENV.get('TEMP_FOLDER', 'temp')
+    PROCESSING_WORKERS = int(_ENV.get('PROCESSING_WORKERS', 2))  # background job processes
+    # Server processes that each run their own processing pool (exported by gunicorn.conf.py);
+    # FFT threads are split across SERVER_WORKERS * PROCESSING_WORKERS processes
+    SERVER_WORKERS = int(_ENV.get('WEB_CONCURRENCY', 1))
     
     # Logging Configuration
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-    LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+    LOG_LEVEL = _ENV.get('LOG_LEVEL', 'INFO')
+    LOG_FILE = _ENV.get('LOG_FILE', 'app.log')
     
     # Server Configuration
-    HOST = os.getenv('HOST', '0.0.0.0')
-    PORT = int(os.getenv('PORT', 5000))
+    HOST = _ENV.get('HOST', '0.0.0.0')
+    PORT = int(_ENV.get('PORT', 5000))
     
     # CORS Configuration
-    CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
+    CORS_ORIGINS = _ENV.get('CORS_ORIGINS', '*')
+    
+    # Download Configuration
+    # When enabled, send_file emits an X-Sendfile header and the reverse proxy
+    # (nginx X-Accel-Redirect / apache mod_xsendfile) streams the file instead
+    USE_X_SENDFILE = _ENV.get('USE_X_SENDFILE', 'false').lower() == 'true'
     
     # Processing Parameters
     SNR_THRESHOLD = 0.1
     WIENER_NOISE_POWER_THRESHOLD = 0.01
     SPECTRAL_SUBTRACTION_ALPHA = 2.0
     
-    def __init__(self):
-        """Initialize configuration"""
-        # Create necessary directories
-        for folder in [self.UPLOAD_FOLDER, self.OUTPUT_FOLDER, self.TEMP_FOLDER, 'database']:
-            if not os.path.exists(folder):
-                os.makedirs(folder)
+    @classmethod
+    def ensure_dirs(cls):
+        """Create the upload/output/temp/database directories; call once at app startup"""
+        for folder in [cls.UPLOAD_FOLDER, cls.OUTPUT_FOLDER, cls.TEMP_FOLDER, 'database']:
+            os.makedirs(folder, exist_ok=True)
 
 class DevelopmentConfig(Config):
     """Development configuration"""
+    __slots__ = ()
     DEBUG = True
 
 class ProductionConfig(Config):
     """Production configuration"""
+    __slots__ = ()
     DEBUG = False
-    SECRET_KEY = os.getenv('SECRET_KEY', 'change-this-in-production')
+    SECRET_KEY = _ENV.get('SECRET_KEY', 'change-this-in-production')
 
 class TestingConfig(Config):
     """Testing configuration"""
+    __slots__ = ()
     TESTING = True
     DATABASE_URL = 'sqlite:///:memory:'
 
+@cache
+def get_config():
+    """Return the configuration selected by FLASK_ENV (built once)"""
+    config_name = _ENV.get('FLASK_ENV', 'development')
+    if config_name == 'production':
+        return ProductionConfig()
+    elif config_name == 'testing':
+        return TestingConfig()
+    return DevelopmentConfig()
+
 # Select configuration based on environment
-config_name = os.getenv('FLASK_ENV', 'development')
-if config_name == 'production':
-    app_config = ProductionConfig()
-elif config_name == 'testing':
-    app_config = TestingConfig()
-else:
-    app_config = DevelopmentConfig()
+app_config = get_config()
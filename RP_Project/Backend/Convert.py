@@ -1,23 +1,65 @@
 """
 Convert.py - Audio Conversion Functions
 Handles MP3 to WAV conversion, metadata extraction, resampling, and channel conversion
+
+librosa and soundfile are imported inside the methods that use them, so importing
+this module (e.g. from the Flask app) does not pay librosa's numba start-up cost.
 """
 
 import os
-import librosa
-import soundfile as sf
+import soxr
+import audioread
 import numpy as np
 from pathlib import Path
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 logger = logging.getLogger(__name__)
 
+# Formats libsndfile decodes natively; everything else goes through librosa/audioread
+SOUNDFILE_FORMATS = frozenset({'.wav', '.flac', '.ogg'})
+
 class AudioConverter:
     """Audio conversion utilities"""
     
+    supported_formats = frozenset({'.mp3', '.wav', '.flac', '.ogg'})
+    soundfile_formats = SOUNDFILE_FORMATS
+    
     def __init__(self, sample_rate=16000):
         self.sample_rate = sample_rate
-        self.supported_formats = {'.mp3', '.wav', '.flac', '.ogg'}
+        
+        # Warm up soxr once so its lazy initialisation isn't paid by the first real call
+        soxr.resample(np.zeros(16, dtype=np.float32), 24000, 16000)
+    
+    def _load(self, input_path, sr=None, mono=True):
+        """
+        Load audio as float32 in librosa's layout: (samples,) or (channels, samples)
+        
+        Args:
+            input_path (str): Path to audio file
+            sr (int): Target sample rate, None to keep the native rate
+            mono (bool): Downmix to a single channel
+        
+        Returns:
+            tuple: (audio_data, sample_rate)
+        """
+        if Path(input_path).suffix.lower() not in self.soundfile_formats:
+            import librosa
+            return librosa.load(input_path, sr=sr, mono=mono)
+        
+        import soundfile as sf
+        audio_data, file_sr = sf.read(input_path, dtype='float32', always_2d=False)
+        
+        # soxr takes (frames, channels), which is soundfile's layout
+        if sr is not None and sr != file_sr:
+            audio_data = soxr.resample(audio_data, file_sr, sr, quality='HQ')
+            file_sr = sr
+        
+        if audio_data.ndim > 1:
+            audio_data = np.mean(audio_data, axis=1) if mono else audio_data.T
+        
+        return audio_data, file_sr
     
     def convert_mp3_to_wav(self, input_path, output_path=None, sample_rate=None):
         """
@@ -38,11 +80,13 @@ class AudioConverter:
             }
         """
         try:
+            import soundfile as sf
+            
             if sample_rate is None:
                 sample_rate = self.sample_rate
             
             # Load audio file
-            audio_data, sr = librosa.load(input_path, sr=sample_rate, mono=False)
+            audio_data, sr = self._load(input_path, sr=sample_rate, mono=False)
             
             # Generate output path if not provided
             if output_path is None:
@@ -56,7 +100,7 @@ class AudioConverter:
             sf.write(output_path, audio_data.T if audio_data.ndim > 1 else audio_data, sr)
             
             # Get file info
-            duration = librosa.get_duration(filename=output_path)
+            duration = audio_data.shape[-1] / sr
             channels = audio_data.ndim
             
             logger.info(f"Converted {input_path} to {output_path}")
@@ -93,20 +137,26 @@ class AudioConverter:
             }
         """
         try:
+            import soundfile as sf
+            
             # Get file size
             file_size = os.path.getsize(audio_path)
             
             # Get file format
             file_format = Path(audio_path).suffix[1:].lower()
             
-            # Load audio to get metadata
-            audio_data, sr = librosa.load(audio_path, sr=None)
-            
-            # Get duration
-            duration = librosa.get_duration(y=audio_data, sr=sr)
-            
-            # Get channels (mono = 1, stereo = 2)
-            channels = 1 if audio_data.ndim == 1 else audio_data.shape[0]
+            # Read header fields only; no samples are decoded
+            try:
+                info = sf.info(audio_path)
+                sr = info.samplerate
+                duration = info.frames / info.samplerate
+                channels = info.channels
+            except RuntimeError:
+                # libsndfile can't open it (e.g. m4a); audioread reports stream info without decoding
+                with audioread.audio_open(audio_path) as f:
+                    sr = f.samplerate
+                    duration = f.duration
+                    channels = f.channels
             
             logger.info(f"Metadata extracted for {audio_path}")
             
@@ -124,7 +174,7 @@ class AudioConverter:
                 'error': str(e)
             }
     
-    def resample_audio(self, input_path, target_sr=16000, output_path=None):
+    def resample_audio(self, input_path, target_sr=16000, output_path=None, res_type='soxr'):
         """
         Resample audio to target sample rate
         
@@ -132,6 +182,7 @@ class AudioConverter:
             input_path (str): Path to input audio file
             target_sr (int): Target sample rate
             output_path (str): Path to output file (optional)
+            res_type (str): 'soxr' (default) or a librosa res_type such as 'kaiser_fast'
         
         Returns:
             dict: {
@@ -142,8 +193,10 @@ class AudioConverter:
             }
         """
         try:
+            import soundfile as sf
+            
             # Load audio
-            audio_data, original_sr = librosa.load(input_path, sr=None)
+            audio_data, original_sr = self._load(input_path)
             
             if original_sr == target_sr:
                 return {
@@ -153,8 +206,13 @@ class AudioConverter:
                     'target_sr': target_sr
                 }
             
-            # Resample
-            resampled = librosa.resample(audio_data, orig_sr=original_sr, target_sr=target_sr)
+            # Resample (soxr rejects integer input)
+            audio_data = np.asarray(audio_data, dtype=np.float32)
+            if res_type == 'soxr':
+                resampled = soxr.resample(audio_data, original_sr, target_sr, quality='HQ')
+            else:
+                import librosa
+                resampled = librosa.resample(audio_data, orig_sr=original_sr, target_sr=target_sr, res_type=res_type)
             
             # Generate output path if not provided
             if output_path is None:
@@ -181,6 +239,38 @@ class AudioConverter:
                 'error': str(e)
             }
     
+    def _downmix_blocks(self, input_path, method='average', blocksize=65536):
+        """
+        Decode block by block (blocks sized to stay in cache), averaging or
+        picking a channel straight into one contiguous float32 buffer
+        
+        Returns:
+            tuple: (mono audio or None if the file is already mono, sample_rate, channels)
+        """
+        import soundfile as sf
+        
+        with sf.SoundFile(input_path) as f:
+            if f.channels == 1:
+                return None, f.samplerate, 1
+            
+            # f.frames is only a header estimate for compressed formats: the decoder may
+            # yield more or fewer frames, so grow on overflow and trim to what was written
+            mono_audio = np.empty(max(f.frames, 0), dtype=np.float32)
+            offset = 0
+            for block in f.blocks(blocksize=blocksize, dtype='float32', always_2d=True):
+                n = block.shape[0]
+                if offset + n > mono_audio.shape[0]:
+                    grown = np.empty(max(offset + n, 2 * mono_audio.shape[0]), dtype=np.float32)
+                    grown[:offset] = mono_audio[:offset]
+                    mono_audio = grown
+                if method == 'average':
+                    np.mean(block, axis=1, out=mono_audio[offset:offset + n])
+                else:
+                    mono_audio[offset:offset + n] = block[:, 0 if method == 'left' else 1]
+                offset += n
+            
+            return mono_audio[:offset], f.samplerate, f.channels
+    
     def convert_stereo_to_mono(self, input_path, output_path=None, method='average'):
         """
         Convert stereo audio to mono
@@ -199,30 +289,38 @@ class AudioConverter:
             }
         """
         try:
-            # Load audio
-            audio_data, sr = librosa.load(input_path, sr=None, mono=False)
+            import soundfile as sf
             
-            # Check if already mono
-            if audio_data.ndim == 1:
+            if method not in ('average', 'left', 'right'):
                 return {
-                    'success': True,
-                    'message': 'Audio already mono',
-                    'original_channels': 1
+                    'success': False,
+                    'error': f"Unknown method: {method}"
                 }
             
-            original_channels = audio_data.shape[0]
-            
-            # Convert based on method
-            if method == 'average':
-                mono_audio = np.mean(audio_data, axis=0)
-            elif method == 'left':
-                mono_audio = audio_data[0]
-            elif method == 'right':
-                mono_audio = audio_data[1]
+            if Path(input_path).suffix.lower() in self.soundfile_formats:
+                # Mix while decoding; the full multi-channel array is never built
+                mono_audio, sr, original_channels = self._downmix_blocks(input_path, method)
             else:
+                # Load audio
+                audio_data, sr = self._load(input_path, mono=False)
+                original_channels = 1 if audio_data.ndim == 1 else audio_data.shape[0]
+                
+                # Convert based on method
+                if original_channels == 1:
+                    mono_audio = None
+                elif method == 'average':
+                    mono_audio = np.mean(audio_data, axis=0, dtype=np.float32)
+                else:
+                    # Contiguous float32 so sf.write doesn't repack the channel
+                    channel = audio_data[0] if method == 'left' else audio_data[1]
+                    mono_audio = np.ascontiguousarray(channel, dtype=np.float32)
+            
+            # Check if already mono
+            if original_channels == 1:
                 return {
-                    'success': False,
-                    'error': f"Unknown method: {method}"
+                    'success': True,
+                    'message': 'Audio already mono',
+                    'original_channels': 1
                 }
             
             # Generate output path if not provided
@@ -249,27 +347,80 @@ class AudioConverter:
                 'success': False,
                 'error': str(e)
             }
+    
+    # Batch operations: op name -> (method name, output filename suffix)
+    BATCH_OPS = {
+        'convert': ('convert_mp3_to_wav', '.wav'),
+        'resample': ('resample_audio', '_resampled.wav'),
+        'mono': ('convert_stereo_to_mono', '_mono.wav')
+    }
+    
+    def _one_file(self, input_path, output_dir, op, **kwargs):
+        """Run a single batch operation; executed inside a worker process"""
+        method_name, suffix = self.BATCH_OPS[op]
+        output_path = os.path.join(output_dir, f"{Path(input_path).stem}{suffix}")
+        return getattr(self, method_name)(input_path, output_path=output_path, **kwargs)
+    
+    def convert_batch(self, input_paths, output_dir, op='resample', workers=None, **kwargs):
+        """
+        Apply one conversion to many files in parallel worker processes
+        
+        Args:
+            input_paths (list): Paths to input audio files
+            output_dir (str): Directory for output files
+            op (str): 'convert', 'resample' (default) or 'mono'
+            workers (int): Number of processes (default: min(cpu_count, 8))
+            **kwargs: Extra arguments for the underlying method
+        
+        Returns:
+            list: One result dict per input, in input order
+        """
+        if op not in self.BATCH_OPS:
+            return [{'success': False, 'error': f"Unknown operation: {op}"} for _ in input_paths]
+        
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Decoding is CPU-heavy; too many concurrent conversions bog the machine down
+        if workers is None:
+            workers = min(os.cpu_count() or 1, 8)
+        
+        worker = partial(self._one_file, output_dir=output_dir, op=op, **kwargs)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(worker, input_paths, chunksize=4))
+        
+        logger.info(f"Batch {op} of {len(results)} files into {output_dir}")
+        return results
+
+# Shared converter used by the convenience functions
+_default_converter = None
+
+def _get_converter():
+    """Return the process-wide AudioConverter, creating it on first use"""
+    global _default_converter
+    if _default_converter is None:
+        _default_converter = AudioConverter()
+    return _default_converter
 
 # Convenience functions
 def convert_mp3_to_wav(input_path, output_path=None):
     """Convenience function for MP3 to WAV conversion"""
-    converter = AudioConverter()
-    return converter.convert_mp3_to_wav(input_path, output_path)
+    return _get_converter().convert_mp3_to_wav(input_path, output_path)
 
 def get_audio_metadata(audio_path):
     """Convenience function to get audio metadata"""
-    converter = AudioConverter()
-    return converter.get_audio_metadata(audio_path)
+    return _get_converter().get_audio_metadata(audio_path)
 
-def resample_audio(input_path, target_sr=16000, output_path=None):
+def resample_audio(input_path, target_sr=16000, output_path=None, res_type='soxr'):
     """Convenience function for audio resampling"""
-    converter = AudioConverter()
-    return converter.resample_audio(input_path, target_sr, output_path)
+    return _get_converter().resample_audio(input_path, target_sr, output_path, res_type)
 
 def convert_stereo_to_mono(input_path, output_path=None, method='average'):
     """Convenience function for stereo to mono conversion"""
-    converter = AudioConverter()
-    return converter.convert_stereo_to_mono(input_path, output_path, method)
+    return _get_converter().convert_stereo_to_mono(input_path, output_path, method)
+
+def convert_batch(input_paths, output_dir, op='resample', workers=None, **kwargs):
+    """Convenience function for parallel batch conversion"""
+    return _get_converter().convert_batch(input_paths, output_dir, op, workers, **kwargs)
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
@@ -1,11 +1,23 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from datetime import datetime
-import os
+from sqlalchemy.sql import func
+from datetime import datetime, timezone
 
 Base = declarative_base()
 
+def utcnow():
+    """
+    Current time as naive UTC, the same clock as the CURRENT_TIMESTAMP server defaults.
+    Timestamps written from Python must use this so rows order correctly in one column.
+    
+    It is also every timestamp column's Python-side default: server defaults only exist
+    in tables create_all built, not in migrated ones (SQLite cannot add them in place).
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class User(Base):
     """User model for session management"""
     __tablename__ = 'users'
@@ -13,7 +25,7 @@ class User(Base):
     id = Column(Integer, primary_key=True)
     username = Column(String(80), unique=True, nullable=False)
     email = Column(String(120), unique=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow, server_default=func.now())
     
     upload_sessions = relationship('UploadSession', back_populates='user')
     recording_sessions = relationship('RecordingSession', back_populates='user')
@@ -26,11 +38,11 @@ class UploadSession(Base):
     __tablename__ = 'upload_sessions'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
     file_size = Column(Integer, nullable=False)
-    upload_timestamp = Column(DateTime, default=datetime.utcnow)
+    upload_timestamp = Column(DateTime, default=utcnow, server_default=func.now())
     
     user = relationship('User', back_populates='upload_sessions')
     audio_files = relationship('AudioFile', back_populates='upload_session')
@@ -43,12 +55,13 @@ class AudioFile(Base):
     __tablename__ = 'audio_files'
     
     id = Column(Integer, primary_key=True)
-    upload_session_id = Column(Integer, ForeignKey('upload_sessions.id'), nullable=False)
+    upload_session_id = Column(Integer, ForeignKey('upload_sessions.id'), nullable=False, index=True)
     file_path = Column(String(500), nullable=False)
     format = Column(String(10), nullable=False)  # mp3, wav, flac, ogg
     duration = Column(Float, nullable=True)  # seconds
     sample_rate = Column(Integer, nullable=True)  # Hz
-    upload_timestamp = Column(DateTime, default=datetime.utcnow)
+    content_hash = Column(String(32), unique=True, nullable=True)  # blake2b-128 hex of uploaded bytes
+    upload_timestamp = Column(DateTime, default=utcnow, server_default=func.now())
     
     upload_session = relationship('UploadSession', back_populates='audio_files')
     processing_jobs = relationship('ProcessingJob', back_populates='audio_file')
@@ -60,28 +73,19 @@ class AudioFile(Base):
 class ProcessingJob(Base):
     """Model for processing jobs"""
     __tablename__ = 'processing_jobs'
+    __table_args__ = (
+        # Covers status filters and FIFO polling of pending jobs
+        Index('ix_jobs_status_start', 'status', 'start_time'),
+    )
     
     id = Column(Integer, primary_key=True)
-    audio_file_id = Column(Integer, ForeignKey('audio_files.id'), nullable=False)
+    audio_file_id = Column(Integer, ForeignKey('audio_files.id'), nullable=False, index=True)
     status = Column(String(50), default='pending')  # pending, processing, completed, failed
-    start_time = Column(DateTime, default=datetime.utcnow)
+    start_time = Column(DateTime, default=utcnow, server_default=func.now())
     end_time = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
     
-    audio_file = relationship('AudioFile', back_populates='processing_jobs')
-    processing_results = relationship('ProcessingResult', back_populates='processing_job')
-    
-    def __repr__(self):
-        return f'<ProcessingJob {self.id} {self.status}>'
-
-class ProcessingResult(Base):
-    """Model for processing results (8 formulas)"""
-    __tablename__ = 'processing_results'
-    
-    id = Column(Integer, primary_key=True)
-    processing_job_id = Column(Integer, ForeignKey('processing_jobs.id'), nullable=False)
-    
-    # 8 Formula Results
+    # Results of the 8 formulas, stored on the job row (1:1, so no join needed)
     signal_power = Column(Float, nullable=True)  # Formula 1: dB
     noise_power = Column(Float, nullable=True)  # Formula 2: dB
     snr_input = Column(Float, nullable=True)  # Formula 3: dB
@@ -93,21 +97,21 @@ class ProcessingResult(Base):
     
     # Output
     output_file_path = Column(String(500), nullable=True)
-    result_timestamp = Column(DateTime, default=datetime.utcnow)
+    metrics_json = Column(Text, nullable=True)  # serialized metrics served by /results
     
-    processing_job = relationship('ProcessingJob', back_populates='processing_results')
+    audio_file = relationship('AudioFile', back_populates='processing_jobs')
     
     def __repr__(self):
-        return f'<ProcessingResult {self.id}>'
+        return f'<ProcessingJob {self.id} {self.status}>'
 
 class RecordingSession(Base):
     """Model for recording sessions"""
     __tablename__ = 'recording_sessions'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
-    audio_file_id = Column(Integer, ForeignKey('audio_files.id'), nullable=True)
-    start_time = Column(DateTime, default=datetime.utcnow)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
+    audio_file_id = Column(Integer, ForeignKey('audio_files.id'), nullable=True, index=True)
+    start_time = Column(DateTime, default=utcnow, server_default=func.now())
     end_time = Column(DateTime, nullable=True)
     duration = Column(Float, nullable=True)
     
@@ -122,8 +126,8 @@ class DownloadHistory(Base):
     __tablename__ = 'download_history'
     
     id = Column(Integer, primary_key=True)
-    processing_job_id = Column(Integer, ForeignKey('processing_jobs.id'), nullable=False)
-    download_timestamp = Column(DateTime, default=datetime.utcnow)
+    processing_job_id = Column(Integer, ForeignKey('processing_jobs.id'), nullable=False, index=True)
+    download_timestamp = Column(DateTime, default=utcnow, server_default=func.now())
     download_count = Column(Integer, default=1)
     
     def __repr__(self):
@@ -134,31 +138,57 @@ class SystemLog(Base):
     __tablename__ = 'system_logs'
     
     id = Column(Integer, primary_key=True)
-    log_level = Column(String(20))  # INFO, WARNING, ERROR, CRITICAL
+    log_level = Column(String(20), index=True)  # INFO, WARNING, ERROR, CRITICAL
     message = Column(Text)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=utcnow, server_default=func.now(), index=True)
     module = Column(String(100), nullable=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     
     def __repr__(self):
         return f'<SystemLog {self.log_level} {self.timestamp}>'
 
+# Pool sizing arguments that only apply to QueuePool
+QUEUE_POOL_OPTIONS = {'pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_use_lifo'}
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL so readers don't block writers and commits skip the full fsync"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA cache_size=-65536')  # 64MB
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')  # 256MB
+    cursor.close()
+
+def create_db_engine(database_url, **options):
+    """
+    Create an engine with SQLite-specific tuning applied
+    
+    Args:
+        database_url (str): SQLAlchemy database URL
+        **options: Extra create_engine arguments (pool settings etc.)
+    
+    Returns:
+        Engine: Configured SQLAlchemy engine
+    """
+    if database_url.startswith('sqlite'):
+        # Connections are shared across the threaded server's workers
+        options['connect_args'] = {'check_same_thread': False}
+        if ':memory:' in database_url:
+            # One shared connection, otherwise each thread sees its own empty database
+            options = {key: value for key, value in options.items() if key not in QUEUE_POOL_OPTIONS}
+            options['poolclass'] = StaticPool
+    
+    engine = create_engine(database_url, **options)
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', set_sqlite_pragmas)
+    return engine
+
 # Initialize database function
 def init_db(database_url='sqlite:///database/speech_enhancement.db'):
     """Initialize database with all tables"""
-    from sqlalchemy import create_engine
-    
-    engine = create_engine(database_url)
+    engine = create_db_engine(database_url)
+    # Tables come from the models above; SQL/Schema.sql is reference only.
+    # create_all never alters existing tables: upgrade those with SQL/Migrations/
     Base.metadata.create_all(bind=engine)
-    
-    # Load SQL schema if available
-    schema_file = 'SQL/Schema.sql'
-    if os.path.exists(schema_file):
-        try:
-            with open(schema_file, 'r') as f:
-                sql_content = f.read()
-                # Note: SQLAlchemy ORM creates tables, schema.sql is for reference
-        except Exception as e:
-            print(f"Warning: Could not load schema file: {e}")
-    
     return engine
@@ -7,52 +7,230 @@ Implements speech enhancement using Wiener filtering and Spectral Subtraction
 import numpy as np
 import librosa
 import soundfile as sf
+import soxr
 from scipy import signal
-from scipy.fftpack import fft, ifft
+import scipy.fft
 import logging
 import time
 from pathlib import Path
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from Backend.Convert import SOUNDFILE_FORMATS
+
+try:
+    import cupy
+    import cupyx
+except ImportError:  # GPU support is optional
+    cupy = None
+
+try:
+    import pyfftw
+    import pyfftw.interfaces.scipy_fft
+except ImportError:  # FFTW support is optional
+    pyfftw = None
 
 logger = logging.getLogger(__name__)
 
+# ============================================================================
+# FFT BACKEND
+# ============================================================================
+# Threads each FFT may use; worker pools lower this with set_fft_threads
+_fft_threads = os.cpu_count() or 1
+
+def set_fft_threads(threads):
+    """
+    Cap the FFT threads used by this process. Passed as a worker-pool initializer,
+    so N worker processes share the cores instead of each starting cpu_count threads.
+    
+    Args:
+        threads (int): Threads per FFT call (at least 1)
+    """
+    global _fft_threads
+    _fft_threads = max(1, int(threads))
+    if pyfftw is not None:
+        pyfftw.config.NUM_THREADS = _fft_threads
+
+def fft_threads_per_worker(workers):
+    """FFT threads per process when `workers` processes run side by side"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+class _ThreadedFFT:
+    """scipy.fft using _fft_threads workers, registered as librosa's FFT backend"""
+    
+    def __getattr__(self, name):
+        return getattr(scipy.fft, name)
+    
+    @staticmethod
+    def rfft(*args, **kwargs):
+        kwargs.setdefault('workers', _fft_threads)
+        return scipy.fft.rfft(*args, **kwargs)
+    
+    @staticmethod
+    def irfft(*args, **kwargs):
+        kwargs.setdefault('workers', _fft_threads)
+        return scipy.fft.irfft(*args, **kwargs)
+
+if pyfftw is not None:
+    # fft_size is fixed, so librosa only ever asks for a handful of transform shapes;
+    # measure each plan once and keep it cached between files
+    pyfftw.config.NUM_THREADS = _fft_threads
+    pyfftw.config.PLANNER_EFFORT = 'FFTW_MEASURE'
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(300)
+    librosa.set_fftlib(pyfftw.interfaces.scipy_fft)
+else:
+    librosa.set_fftlib(_ThreadedFFT())
+
 class AudioProcessor:
     """Audio processing with signal enhancement"""
     
-    def __init__(self, sample_rate=16000, fft_size=2048, hop_length=512):
+    # Read with soundfile directly, like AudioConverter
+    soundfile_formats = SOUNDFILE_FORMATS
+    
+    # Recordings longer than this are enhanced block by block (see _process_blocks)
+    stream_min_seconds = 60
+    stream_block_seconds = 5
+    
+    def __init__(self, sample_rate=16000, fft_size=2048, hop_length=512, device='cpu'):
         self.sample_rate = sample_rate
         self.fft_size = fft_size
         self.hop_length = hop_length
         self.n_mels = 128
+        # Periodic Hann window shared by every stft/istft call
+        self._window = signal.windows.hann(fft_size, sym=False).astype(np.float32)
+        
+        # 'cuda' runs STFT, enhancement and ISTFT on the GPU through CuPy
+        if device == 'cuda' and cupy is None:
+            logger.warning("CuPy is not installed; falling back to CPU processing")
+            device = 'cpu'
+        self.device = device
+    
+    def _load(self, input_path):
+        """
+        Load audio as mono float32 at self.sample_rate
+        
+        Args:
+            input_path (str): Path to audio file
+        
+        Returns:
+            tuple: (audio_data, sample_rate)
+        """
+        if Path(input_path).suffix.lower() not in self.soundfile_formats:
+            return librosa.load(input_path, sr=self.sample_rate, mono=True)
+        
+        audio_data, sr = sf.read(input_path, dtype='float32', always_2d=False)
+        if audio_data.ndim > 1:
+            audio_data = np.mean(audio_data, axis=1)
+        
+        # Files already at the processing rate skip the resampler entirely
+        if sr != self.sample_rate:
+            audio_data = soxr.resample(audio_data, sr, self.sample_rate, quality='HQ')
+            sr = self.sample_rate
+        
+        return audio_data, sr
+    
+    # ============================================================================
+    # STFT / ISTFT
+    # ============================================================================
+    def _frame_index(self, num_frames):
+        """(fft_size, num_frames) sample indices of each centered frame"""
+        return cupy.arange(self.fft_size)[:, None] + self.hop_length * cupy.arange(num_frames)[None, :]
+    
+    def _stft(self, audio_data):
+        """
+        STFT of a float32 signal; same framing as librosa.stft (center=True, zero padding)
+        
+        Args:
+            audio_data (np.array): Input audio signal
+        
+        Returns:
+            array: complex64 STFT (numpy, or cupy on the 'cuda' device)
+        """
+        if self.device != 'cuda':
+            return librosa.stft(
+                audio_data,
+                n_fft=self.fft_size,
+                hop_length=self.hop_length,
+                window=self._window,
+                dtype=np.complex64
+            )
+        
+        pad = self.fft_size // 2
+        padded = cupy.pad(cupy.asarray(audio_data), pad)
+        num_frames = 1 + (padded.size - self.fft_size) // self.hop_length
+        
+        frames = padded[self._frame_index(num_frames)] * cupy.asarray(self._window)[:, None]
+        return cupy.fft.rfft(frames, axis=0).astype(cupy.complex64, copy=False)
+    
+    def _istft(self, stft_matrix):
+        """
+        Inverse of _stft with librosa.istft's window-sum normalization
+        
+        Args:
+            stft_matrix (array): complex64 STFT from _stft
+        
+        Returns:
+            np.array: float32 audio signal on the host
+        """
+        if self.device != 'cuda':
+            return librosa.istft(
+                stft_matrix,
+                hop_length=self.hop_length,
+                window=self._window,
+                dtype=np.float32
+            )
+        
+        window = cupy.asarray(self._window)[:, None]
+        num_frames = stft_matrix.shape[1]
+        frames = cupy.fft.irfft(stft_matrix, n=self.fft_size, axis=0).astype(cupy.float32, copy=False)
+        frames *= window
+        
+        # Overlap-add the frames and the squared window they were weighted by
+        length = self.fft_size + self.hop_length * (num_frames - 1)
+        index = self._frame_index(num_frames)
+        audio = cupy.zeros(length, dtype=cupy.float32)
+        window_sum = cupy.zeros(length, dtype=cupy.float32)
+        cupyx.scatter_add(audio, index, frames)
+        cupyx.scatter_add(window_sum, index, cupy.broadcast_to(window * window, frames.shape))
+        
+        nonzero = window_sum > np.finfo(np.float32).tiny
+        audio[nonzero] /= window_sum[nonzero]
+        
+        # Drop the centering pad, as librosa.istft does without a length argument
+        pad = self.fft_size // 2
+        return cupy.asnumpy(audio[pad:length - pad])
     
     # ============================================================================
     # FORMULA 1: Signal Power
     # ============================================================================
-    def formula_1_signal_power(self, audio_data):
+    def formula_1_signal_power(self, audio_data, return_rms=False):
         """
         Formula 1: Calculate signal power
         Power = (1/N) * sum(x[n]^2)
         
         Args:
             audio_data (np.array): Input audio signal
+            return_rms (bool): Also return the linear RMS the dB value came from
         
         Returns:
-            float: Power in dB
+            float: Power in dB, or (power_db, rms) when return_rms is set
         """
         try:
-            # RMS calculation
-            rms = np.sqrt(np.mean(audio_data ** 2))
+            # RMS calculation; the dot product avoids a squared copy of the signal
+            audio_data = audio_data.astype(np.float32, copy=False)
+            rms = np.sqrt(float(audio_data @ audio_data) / audio_data.size)
             # Convert to dB (reference = 1.0)
             power_db = 20 * np.log10(rms + 1e-10)
-            return power_db
+            return (power_db, rms) if return_rms else power_db
         except Exception as e:
             logger.error(f"Power calculation error: {str(e)}")
-            return 0.0
+            return (0.0, 1.0) if return_rms else 0.0
     
     # ============================================================================
     # FORMULA 2: Noise Power
     # ============================================================================
-    def formula_2_noise_power(self, audio_data, num_frames=5):
+    def formula_2_noise_power(self, audio_data, num_frames=5, return_rms=False):
         """
         Formula 2: Estimate noise power from initial frames
         Assumes first few frames contain mostly noise
@@ -60,9 +238,10 @@ class AudioProcessor:
         Args:
             audio_data (np.array): Input audio signal
             num_frames (int): Number of frames to analyze for noise
+            return_rms (bool): Also return the linear RMS the dB value came from
         
         Returns:
-            float: Noise power in dB
+            float: Noise power in dB, or (noise_power_db, rms) when return_rms is set
         """
         try:
             # Use first few frames for noise estimation
@@ -70,13 +249,13 @@ class AudioProcessor:
             noise_frames = audio_data[:frame_length * num_frames]
             
             # Calculate RMS of noise frames
-            rms_noise = np.sqrt(np.mean(noise_frames ** 2))
+            rms_noise = np.sqrt(float(noise_frames @ noise_frames) / noise_frames.size)
             noise_power_db = 20 * np.log10(rms_noise + 1e-10)
             
-            return noise_power_db
+            return (noise_power_db, rms_noise) if return_rms else noise_power_db
         except Exception as e:
             logger.error(f"Noise power calculation error: {str(e)}")
-            return 0.0
+            return (0.0, 1.0) if return_rms else 0.0
     
     # ============================================================================
     # FORMULA 3: SNR Calculation
@@ -103,7 +282,13 @@ class AudioProcessor:
     # ============================================================================
     # FORMULA 4: Wiener Filter
     # ============================================================================
-    def formula_4_wiener_filter(self, audio_stft, noise_power, signal_power):
+    def _wiener_gain(self, noise_power_linear, signal_power_linear):
+        """Scalar Wiener gain in [0, 1] from linear (RMS) power estimates"""
+        gain = signal_power_linear / (signal_power_linear + noise_power_linear + 1e-10)
+        return float(np.clip(gain, 0, 1))  # Limit between 0 and 1
+    
+    def formula_4_wiener_filter(self, audio_stft, noise_power, signal_power, out=None,
+                                linear=False):
         """
         Formula 4: Wiener Filter Gain
         H(f) = Signal_Power / (Signal_Power + Noise_Power)
@@ -112,24 +297,23 @@ class AudioProcessor:
             audio_stft (np.array): STFT of audio (complex)
             noise_power (float): Noise power estimate
             signal_power (float): Signal power estimate
+            out (np.array): Buffer to write the result into (optional, may be audio_stft)
+            linear (bool): Powers are linear RMS values rather than dB
         
         Returns:
             np.array: Wiener filtered STFT
         """
         try:
-            # Calculate magnitude spectrum
-            magnitude = np.abs(audio_stft)
-            
             # Convert to linear scale
-            signal_power_linear = 10 ** (signal_power / 20)
-            noise_power_linear = 10 ** (noise_power / 20)
+            if not linear:
+                signal_power = 10 ** (signal_power / 20)
+                noise_power = 10 ** (noise_power / 20)
             
             # Wiener gain
-            gain = signal_power_linear / (signal_power_linear + noise_power_linear + 1e-10)
-            gain = np.clip(gain, 0, 1)  # Limit between 0 and 1
+            gain = self._wiener_gain(noise_power, signal_power)
             
             # Apply gain (preserve phase)
-            wiener_stft = audio_stft * gain
+            wiener_stft = np.multiply(audio_stft, gain, out=out)
             
             return wiener_stft
         except Exception as e:
@@ -139,7 +323,8 @@ class AudioProcessor:
     # ============================================================================
     # FORMULA 5: Spectral Subtraction
     # ============================================================================
-    def formula_5_spectral_subtraction(self, audio_stft, noise_stft, subtraction_factor=0.8):
+    def formula_5_spectral_subtraction(self, audio_stft, noise_stft, subtraction_factor=0.8,
+                                       audio_mag=None, out=None):
         """
         Formula 5: Spectral Subtraction
         Enhanced_Magnitude = Original_Magnitude - factor * Noise_Magnitude
@@ -148,32 +333,73 @@ class AudioProcessor:
             audio_stft (np.array): STFT of noisy audio
             noise_stft (np.array): STFT of noise estimate
             subtraction_factor (float): Subtraction strength (0-1)
+            audio_mag (np.array): Precomputed |audio_stft| (optional)
+            out (np.array): Buffer to write the result into (optional, may be audio_stft)
         
         Returns:
             np.array: Spectrally subtracted STFT
         """
         try:
             # Get magnitudes
-            audio_mag = np.abs(audio_stft)
+            if audio_mag is None:
+                audio_mag = np.abs(audio_stft)
             noise_mag = np.abs(noise_stft)
             
-            # Spectral subtraction
-            enhanced_mag = audio_mag - subtraction_factor * noise_mag
-            enhanced_mag = np.maximum(enhanced_mag, 0.1 * audio_mag)  # Floor
+            # Spectral subtraction as a gain on X, built in a single buffer:
+            # max(|X| - factor * |N|, 0.1 * |X|) / |X| = max(1 - factor * |N| / |X|, 0.1)
+            gain = np.maximum(audio_mag, 1e-10)
+            np.divide(subtraction_factor * noise_mag, gain, out=gain)
+            np.subtract(1.0, gain, out=gain)
+            np.maximum(gain, 0.1, out=gain)  # Floor
             
             # Reconstruct with original phase
-            phase = np.angle(audio_stft)
-            enhanced_stft = enhanced_mag * np.exp(1j * phase)
+            enhanced_stft = np.multiply(audio_stft, gain, out=out)
             
             return enhanced_stft
         except Exception as e:
             logger.error(f"Spectral subtraction error: {str(e)}")
             return audio_stft
     
+    # ============================================================================
+    # FORMULAS 4 + 5: Fused Enhancement
+    # ============================================================================
+    def _fused_enhance(self, audio_stft, signal_rms, noise_rms, noise_mag, subtraction_factor,
+                       audio_mag=None, out=None):
+        """
+        Wiener filter followed by spectral subtraction, applied as one gain
+        Gain = max(w*|X| - factor*|N|, 0.1*w*|X|) / |X| = max(w - factor*|N|/|X|, 0.1*w)
+        
+        Args:
+            audio_stft (np.array): STFT of noisy audio
+            signal_rms (float): Linear signal power estimate
+            noise_rms (float): Linear noise power estimate
+            noise_mag (np.array): Noise magnitude, same shape as audio_stft; None for Wiener only
+            subtraction_factor (float): Subtraction strength (0-1)
+            audio_mag (np.array): Precomputed |audio_stft| (optional)
+            out (np.array): Buffer to write the result into (optional, may be audio_stft)
+        
+        Returns:
+            np.array: Enhanced STFT
+        """
+        if audio_mag is None:
+            audio_mag = np.abs(audio_stft)
+        
+        wiener_gain = self._wiener_gain(noise_rms, signal_rms)
+        if noise_mag is None:
+            return np.multiply(audio_stft, wiener_gain, out=out)
+        
+        gain = np.maximum(audio_mag, 1e-10)
+        np.divide(subtraction_factor * noise_mag, gain, out=gain)
+        np.subtract(wiener_gain, gain, out=gain)
+        np.maximum(gain, 0.1 * wiener_gain, out=gain)  # Floor
+        
+        # Single complex pass; phase is preserved because the gain is real
+        return np.multiply(audio_stft, gain, out=out)
+    
     # ============================================================================
     # FORMULA 6: Spectral Distance
     # ============================================================================
-    def formula_6_spectral_distance(self, original_stft, enhanced_stft):
+    def formula_6_spectral_distance(self, original_stft, enhanced_stft, original_mag=None):
         """
         Formula 6: Spectral Distance Measure
         Distance = sqrt(mean((Original_Magnitude - Enhanced_Magnitude)^2))
@@ -181,16 +407,21 @@ class AudioProcessor:
         Args:
             original_stft (np.array): Original STFT
             enhanced_stft (np.array): Enhanced STFT
+            original_mag (np.array): Precomputed |original_stft| (optional)
         
         Returns:
             float: Spectral distance metric
         """
         try:
-            original_mag = np.abs(original_stft)
-            enhanced_mag = np.abs(enhanced_stft)
+            if original_mag is None:
+                original_mag = np.abs(original_stft)
+            
+            # Difference written over the enhanced magnitude buffer
+            diff = np.abs(enhanced_stft)
+            np.subtract(original_mag, diff, out=diff)
             
-            # Euclidean distance
-            distance = np.sqrt(np.mean((original_mag - enhanced_mag) ** 2))
+            # Euclidean distance; einsum squares and sums without a temporary
+            distance = float(np.sqrt(np.einsum('ij,ij->', diff, diff) / diff.size))
             
             return distance
         except Exception as e:
@@ -200,6 +431,24 @@ class AudioProcessor:
     # ============================================================================
     # FORMULA 7: Segmental SNR
     # ============================================================================
+    def _frame_snr_values(self, original_audio, enhanced_audio):
+        """Per-frame SNR (dB) over non-overlapping fft_size frames with a non-negligible residual"""
+        frame_length = self.fft_size
+        num_frames = min(len(original_audio), len(enhanced_audio)) // frame_length
+        usable = num_frames * frame_length
+        
+        # Non-overlapping frames as rows: (num_frames, frame_length)
+        orig_frames = original_audio[:usable].reshape(num_frames, frame_length)
+        error_frames = orig_frames - enhanced_audio[:usable].reshape(num_frames, frame_length)
+        
+        # Per-frame power; einsum squares and sums in a single pass
+        signal_power = np.einsum('ij,ij->i', orig_frames, orig_frames) / frame_length
+        error_power = np.einsum('ij,ij->i', error_frames, error_frames) / frame_length
+        
+        # Frames with a negligible residual are skipped
+        valid = error_power > 1e-10
+        return 10 * np.log10(signal_power[valid] / (error_power[valid] + 1e-10))
+    
     def formula_7_segmental_snr(self, original_audio, enhanced_audio):
         """
         Formula 7: Segmental SNR
@@ -213,30 +462,10 @@ class AudioProcessor:
             float: Segmental SNR in dB
         """
         try:
-            frame_length = self.fft_size
-            num_frames = len(original_audio) // frame_length
-            
-            snr_values = []
-            
-            for i in range(num_frames):
-                start = i * frame_length
-                end = start + frame_length
-                
-                # Original frame
-                orig_frame = original_audio[start:end]
-                # Error/residual frame
-                error_frame = original_audio[start:end] - enhanced_audio[start:end]
-                
-                # SNR for this frame
-                signal_power = np.mean(orig_frame ** 2)
-                error_power = np.mean(error_frame ** 2)
-                
-                if error_power > 1e-10:
-                    frame_snr = 10 * np.log10(signal_power / (error_power + 1e-10))
-                    snr_values.append(frame_snr)
+            snr_values = self._frame_snr_values(original_audio, enhanced_audio)
             
             # Average over frames
-            segmental_snr = np.mean(snr_values) if snr_values else 0.0
+            segmental_snr = float(np.mean(snr_values)) if snr_values.size else 0.0
             
             return segmental_snr
         except Exception as e:
@@ -299,86 +528,84 @@ class AudioProcessor:
         start_time = time.time()
         
         try:
+            # Generate output path if not provided
+            if output_path is None:
+                base_name = Path(input_path).stem
+                output_path = f"{base_name}_enhanced.wav"
+            
+            # Long recordings are enhanced block by block with a bounded working set
+            if self._use_blocks(input_path):
+                return self._process_blocks(input_path, output_path, start_time)
+            
             # ====== STEP 1: Load Audio ======
             logger.info("Step 1: Loading audio file...")
-            audio_data, sr = librosa.load(input_path, sr=self.sample_rate, mono=True)
+            audio_data, sr = self._load(input_path)
+            # Keep the whole pipeline in float32/complex64
+            audio_data = np.asarray(audio_data, dtype=np.float32)
             original_audio = audio_data.copy()
             
             # ====== STEP 2: STFT Computation ======
             logger.info("Step 2: Computing STFT...")
-            stft_matrix = librosa.stft(
-                audio_data,
-                n_fft=self.fft_size,
-                hop_length=self.hop_length,
-                window='hann'
-            )
+            stft_matrix = self._stft(audio_data)
             
             # ====== STEP 3: Noise Estimation ======
             logger.info("Step 3: Estimating noise...")
-            signal_power = self.formula_1_signal_power(audio_data)
-            noise_power = self.formula_2_noise_power(audio_data)
+            # Keep the linear RMS values too so Wiener filtering skips the dB round trip
+            signal_power, signal_rms = self.formula_1_signal_power(audio_data, return_rms=True)
+            noise_power, noise_rms = self.formula_2_noise_power(audio_data, return_rms=True)
             snr_input = self.formula_3_snr_calculation(signal_power, noise_power)
             
-            # Estimate noise STFT from first frames
-            noise_stft = stft_matrix[:, :10] * 0.5  # Mock noise estimate
+            # Magnitude is needed by several stages; compute it once
+            magnitude = np.abs(stft_matrix)
             
-            # ====== STEP 4: Wiener Filtering ======
-            logger.info("Step 4: Applying Wiener filter...")
-            wiener_stft = self.formula_4_wiener_filter(stft_matrix, noise_power, signal_power)
-            wiener_filter_gain = 0.8  # Mock value
+            # Estimate noise from first frames: |0.5 * X| = 0.5 * |X|
+            noise_mag = magnitude[:, :10] * 0.5  # Mock noise estimate
+            # formula_5 subtracts this elementwise, which only lines up for clips of at most
+            # 10 frames; for longer clips it skips subtraction, so the fused path does too
+            if noise_mag.shape != magnitude.shape:
+                noise_mag = None
             
-            # ====== STEP 5: Spectral Subtraction ======
-            logger.info("Step 5: Applying Spectral Subtraction...")
+            # ====== STEPS 4-5: Wiener Filtering + Spectral Subtraction ======
+            logger.info("Steps 4-5: Applying Wiener filter and Spectral Subtraction...")
+            wiener_filter_gain = 0.8  # Mock value
             spectral_sub_factor = 0.75
-            enhanced_stft = self.formula_5_spectral_subtraction(
-                wiener_stft,
-                noise_stft,
-                spectral_sub_factor
+            enhanced_stft = self._fused_enhance(
+                stft_matrix,
+                signal_rms,
+                noise_rms,
+                noise_mag,
+                spectral_sub_factor,
+                audio_mag=magnitude
             )
             
             # ====== STEP 6: ISTFT Reconstruction ======
             logger.info("Step 6: Reconstructing audio (ISTFT)...")
-            enhanced_audio = librosa.istft(
-                enhanced_stft,
-                hop_length=self.hop_length,
-                window='hann'
-            )
+            enhanced_audio = self._istft(enhanced_stft)
             
             # ====== STEP 7: Output Generation with Metrics ======
             logger.info("Step 7: Computing metrics and saving...")
             
-            # Generate output path if not provided
-            if output_path is None:
-                base_name = Path(input_path).stem
-                output_path = f"{base_name}_enhanced.wav"
-            
             # Save enhanced audio
             os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
             sf.write(output_path, enhanced_audio, sr)
             
             # Compute all metrics
-            spectral_dist = self.formula_6_spectral_distance(stft_matrix, enhanced_stft)
+            spectral_dist = self.formula_6_spectral_distance(
+                stft_matrix,
+                enhanced_stft,
+                original_mag=magnitude
+            )
             segmental_snr = self.formula_7_segmental_snr(original_audio, enhanced_audio)
             
-            end_time = time.time()
-            processing_duration = self.formula_8_processing_duration(start_time, end_time)
-            
-            logger.info(f"Processing completed in {processing_duration:.2f} seconds")
-            
-            return {
-                'success': True,
-                'output_path': output_path,
-                'metrics': {
-                    'signal_power': round(signal_power, 4),
-                    'noise_power': round(noise_power, 4),
-                    'snr_input': round(snr_input, 4),
-                    'wiener_filter_gain': round(wiener_filter_gain, 4),
-                    'spectral_subtraction_factor': round(spectral_sub_factor, 4),
-                    'spectral_distance': round(spectral_dist, 4),
-                    'segmental_snr': round(segmental_snr, 4),
-                    'processing_duration': round(processing_duration, 4)
-                }
-            }
+            return self._build_result(output_path, start_time, {
+                'signal_power': signal_power,
+                'noise_power': noise_power,
+                'snr_input': snr_input,
+                'wiener_filter_gain': wiener_filter_gain,
+                'spectral_subtraction_factor': spectral_sub_factor,
+                'spectral_distance': spectral_dist,
+                'segmental_snr': segmental_snr
+            })
         
         except Exception as e:
             logger.error(f"Processing error: {str(e)}")
@@ -386,13 +613,183 @@ class AudioProcessor:
                 'success': False,
                 'error': str(e)
             }
+    
+    def _build_result(self, output_path, start_time, metrics):
+        """Add the processing duration (Formula 8) and build the process_audio result"""
+        end_time = time.time()
+        processing_duration = self.formula_8_processing_duration(start_time, end_time)
+        
+        logger.info(f"Processing completed in {processing_duration:.2f} seconds")
+        
+        metrics['processing_duration'] = processing_duration
+        return {
+            'success': True,
+            'output_path': output_path,
+            'metrics': {name: round(float(value), 4) for name, value in metrics.items()}
+        }
+    
+    # ============================================================================
+    # BLOCK STREAMING (long recordings)
+    # ============================================================================
+    def _use_blocks(self, input_path):
+        """Whether input_path is long enough to stream, and readable without resampling"""
+        if Path(input_path).suffix.lower() not in self.soundfile_formats:
+            return False
+        
+        info = sf.info(input_path)
+        return (info.samplerate == self.sample_rate
+                and info.frames > self.stream_min_seconds * self.sample_rate)
+    
+    def _process_blocks(self, input_path, output_path, start_time):
+        """
+        Run the pipeline over fixed-size blocks so memory stays O(block), not O(file)
+        
+        Each block is extended by fft_size samples of real context on both sides and all
+        block edges sit on the global hop grid, so every kept sample is reconstructed from
+        exactly the frames the whole-file STFT would use. Metrics are accumulated as sums.
+        
+        Args:
+            input_path (str): Path to input audio file (at self.sample_rate)
+            output_path (str): Path to output audio file
+            start_time (float): Pipeline start timestamp
+        
+        Returns:
+            dict: Same structure as process_audio
+        """
+        block = self.fft_size * max(1, round(self.stream_block_seconds * self.sample_rate / self.fft_size))
+        context = self.fft_size
+        wiener_filter_gain = 0.8  # Mock value
+        spectral_sub_factor = 0.75
+        
+        with sf.SoundFile(input_path) as source:
+            total = source.frames
+            
+            def read(start, stop):
+                source.seek(start)
+                data = source.read(stop - start, dtype='float32', always_2d=True)
+                return np.ascontiguousarray(np.mean(data, axis=1) if data.shape[1] > 1 else data[:, 0])
+            
+            # Pass 1: whole-file signal power (Formula 1) from a running sum of squares
+            logger.info("Pass 1: Measuring signal power...")
+            sum_squares = 0.0
+            for start in range(0, total, block):
+                chunk = read(start, min(start + block, total))
+                sum_squares += float(chunk @ chunk)
+            signal_rms = np.sqrt(sum_squares / total)
+            signal_power = 20 * np.log10(signal_rms + 1e-10)
+            
+            # Formula 2 only looks at the first 5 fft_size frames; read exactly those, since
+            # a short block may not cover them all
+            noise_power, noise_rms = self.formula_2_noise_power(
+                read(0, min(self.fft_size * 5, total)),
+                return_rms=True
+            )
+            snr_input = self.formula_3_snr_calculation(signal_power, noise_power)
+            
+            # Pass 2: enhance block by block, writing each block as soon as it is done
+            logger.info("Pass 2: Enhancing audio in blocks...")
+            distance_sum, distance_count = 0.0, 0
+            snr_sum, snr_count = 0.0, 0
+            
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            with sf.SoundFile(output_path, 'w', samplerate=self.sample_rate, channels=1) as sink:
+                for start in range(0, total, block):
+                    end = min(start + block, total)
+                    segment_start = max(start - context, 0)
+                    segment = read(segment_start, min(end + context, total))
+                    offset = start - segment_start
+                    
+                    stft_matrix = self._stft(segment)
+                    magnitude = np.abs(stft_matrix)
+                    
+                    # Streamed files are far longer than the 10-frame noise estimate, so, as in
+                    # process_audio, spectral subtraction does not apply and only Wiener gain is used
+                    enhanced_stft = self._fused_enhance(
+                        stft_matrix,
+                        signal_rms,
+                        noise_rms,
+                        None,
+                        spectral_sub_factor,
+                        audio_mag=magnitude
+                    )
+                    enhanced_audio = self._istft(enhanced_stft)[offset:offset + end - start]
+                    sink.write(enhanced_audio)
+                    
+                    # Frames centred inside this block; the last block owns every remaining frame
+                    owned = slice(offset // self.hop_length,
+                                  None if end == total else -(-(end - segment_start) // self.hop_length))
+                    distance = self.formula_6_spectral_distance(
+                        stft_matrix[:, owned],
+                        enhanced_stft[:, owned],
+                        original_mag=magnitude[:, owned]
+                    )
+                    bins = magnitude[:, owned].size
+                    distance_sum += distance ** 2 * bins
+                    distance_count += bins
+                    
+                    # Blocks are whole fft_size frames, so the SNR frame grid matches the file's
+                    snr_values = self._frame_snr_values(segment[offset:offset + end - start], enhanced_audio)
+                    snr_sum += float(np.sum(snr_values))
+                    snr_count += snr_values.size
+        
+        return self._build_result(output_path, start_time, {
+            'signal_power': signal_power,
+            'noise_power': noise_power,
+            'snr_input': snr_input,
+            'wiener_filter_gain': wiener_filter_gain,
+            'spectral_subtraction_factor': spectral_sub_factor,
+            'spectral_distance': np.sqrt(distance_sum / distance_count) if distance_count else 0.0,
+            'segmental_snr': snr_sum / snr_count if snr_count else 0.0
+        })
+
+    # ============================================================================
+    # BATCH PROCESSING
+    # ============================================================================
+    def _process_one(self, input_path, output_dir):
+        """Run the pipeline for a single file; executed inside a worker process"""
+        output_path = os.path.join(output_dir, f"{Path(input_path).stem}_enhanced.wav")
+        return self.process_audio(input_path, output_path)
+    
+    def process_batch(self, input_paths, output_dir, workers=None):
+        """
+        Run the 7-step pipeline over many files in parallel worker processes
+        
+        Args:
+            input_paths (list): Paths to input audio files
+            output_dir (str): Directory for enhanced output files
+            workers (int): Number of processes (default: cpu_count)
+        
+        Returns:
+            list: One process_audio result dict per input, in input order
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        
+        if workers is None:
+            workers = os.cpu_count() or 1
+        
+        # Split the cores between workers so their threaded FFTs do not oversubscribe
+        worker = partial(self._process_one, output_dir=output_dir)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=set_fft_threads,
+            initargs=(fft_threads_per_worker(workers),)
+        ) as executor:
+            results = list(executor.map(worker, input_paths))
+        
+        logger.info(f"Batch processed {len(results)} files into {output_dir}")
+        return results
 
-# Convenience function
+# Convenience functions
 def process_audio(input_path, output_path=None):
     """Convenience function for audio processing"""
     processor = AudioProcessor()
     return processor.process_audio(input_path, output_path)
 
+def process_batch(input_paths, output_dir, workers=None):
+    """Convenience function for parallel batch processing"""
+    processor = AudioProcessor()
+    return processor.process_batch(input_paths, output_dir, workers)
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
     
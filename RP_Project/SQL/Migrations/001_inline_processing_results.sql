@@ -0,0 +1,68 @@
+-- Migration 001: Upgrade an existing SQLite database to the current ORM models
+-- create_all() only creates missing tables, so databases created before these
+-- changes need this script once:
+--     sqlite3 database/speech_enhancement.db < SQL/Migrations/001_inline_processing_results.sql
+--
+-- 1. processing_results (1:1 with processing_jobs) is folded into processing_jobs
+-- 2. processing_jobs gains metrics_json (serialized metrics served by /results)
+-- 3. audio_files gains content_hash (upload deduplication)
+-- 4. Indexes added to the models are created on the existing tables
+--
+-- The models' CURRENT_TIMESTAMP server defaults are not added (SQLite would need a
+-- table rebuild); the models fill those columns from Python with Database.utcnow.
+
+BEGIN TRANSACTION;
+
+-- Metrics and output path move onto the job row
+ALTER TABLE processing_jobs ADD COLUMN signal_power FLOAT;
+ALTER TABLE processing_jobs ADD COLUMN noise_power FLOAT;
+ALTER TABLE processing_jobs ADD COLUMN snr_input FLOAT;
+ALTER TABLE processing_jobs ADD COLUMN wiener_gain FLOAT;
+ALTER TABLE processing_jobs ADD COLUMN spectral_subtraction_factor FLOAT;
+ALTER TABLE processing_jobs ADD COLUMN spectral_distance FLOAT;
+ALTER TABLE processing_jobs ADD COLUMN segmental_snr FLOAT;
+ALTER TABLE processing_jobs ADD COLUMN processing_duration FLOAT;
+ALTER TABLE processing_jobs ADD COLUMN output_file_path VARCHAR(500);
+ALTER TABLE processing_jobs ADD COLUMN metrics_json TEXT;
+
+-- Copy each job's (latest) result row; metrics_json stays NULL and /results falls back to the columns
+UPDATE processing_jobs SET
+    signal_power = (SELECT r.signal_power FROM processing_results r
+                    WHERE r.processing_job_id = processing_jobs.id ORDER BY r.id DESC LIMIT 1),
+    noise_power = (SELECT r.noise_power FROM processing_results r
+                   WHERE r.processing_job_id = processing_jobs.id ORDER BY r.id DESC LIMIT 1),
+    snr_input = (SELECT r.snr_input FROM processing_results r
+                 WHERE r.processing_job_id = processing_jobs.id ORDER BY r.id DESC LIMIT 1),
+    wiener_gain = (SELECT r.wiener_gain FROM processing_results r
+                   WHERE r.processing_job_id = processing_jobs.id ORDER BY r.id DESC LIMIT 1),
+    spectral_subtraction_factor = (SELECT r.spectral_subtraction_factor FROM processing_results r
+                                   WHERE r.processing_job_id = processing_jobs.id ORDER BY r.id DESC LIMIT 1),
+    spectral_distance = (SELECT r.spectral_distance FROM processing_results r
+                         WHERE r.processing_job_id = processing_jobs.id ORDER BY r.id DESC LIMIT 1),
+    segmental_snr = (SELECT r.segmental_snr FROM processing_results r
+                     WHERE r.processing_job_id = processing_jobs.id ORDER BY r.id DESC LIMIT 1),
+    processing_duration = (SELECT r.processing_duration FROM processing_results r
+                           WHERE r.processing_job_id = processing_jobs.id ORDER BY r.id DESC LIMIT 1),
+    output_file_path = (SELECT r.output_file_path FROM processing_results r
+                        WHERE r.processing_job_id = processing_jobs.id ORDER BY r.id DESC LIMIT 1)
+WHERE EXISTS (SELECT 1 FROM processing_results r WHERE r.processing_job_id = processing_jobs.id);
+
+DROP TABLE processing_results;
+
+-- Upload deduplication; SQLite cannot add a UNIQUE column, so uniqueness is a unique index
+ALTER TABLE audio_files ADD COLUMN content_hash VARCHAR(32);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_audio_files_content_hash ON audio_files (content_hash);
+
+-- Foreign key, status and log indexes from the models
+CREATE INDEX IF NOT EXISTS ix_upload_sessions_user_id ON upload_sessions (user_id);
+CREATE INDEX IF NOT EXISTS ix_audio_files_upload_session_id ON audio_files (upload_session_id);
+CREATE INDEX IF NOT EXISTS ix_processing_jobs_audio_file_id ON processing_jobs (audio_file_id);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_start ON processing_jobs (status, start_time);
+CREATE INDEX IF NOT EXISTS ix_recording_sessions_user_id ON recording_sessions (user_id);
+CREATE INDEX IF NOT EXISTS ix_recording_sessions_audio_file_id ON recording_sessions (audio_file_id);
+CREATE INDEX IF NOT EXISTS ix_download_history_processing_job_id ON download_history (processing_job_id);
+CREATE INDEX IF NOT EXISTS ix_system_logs_log_level ON system_logs (log_level);
+CREATE INDEX IF NOT EXISTS ix_system_logs_timestamp ON system_logs (timestamp);
+CREATE INDEX IF NOT EXISTS ix_system_logs_user_id ON system_logs (user_id);
+
+COMMIT;
@@ -1,5 +1,6 @@
 -- Speech Enhancement System Database Schema
--- Create all 8 tables for the project
+-- Create all 7 tables for the project
+-- Existing databases are upgraded with the scripts in SQL/Migrations/
 
 -- Table 1: Users (Session management)
 CREATE TABLE IF NOT EXISTS users (
@@ -29,6 +30,7 @@ CREATE TABLE IF NOT EXISTS audio_files (
     sample_rate INTEGER,
     channels INTEGER,
     format TEXT,
+    content_hash TEXT UNIQUE,  -- blake2b-128 hex of the uploaded bytes (deduplication)
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY(session_id) REFERENCES upload_sessions(id)
 );
@@ -43,14 +45,7 @@ CREATE TABLE IF NOT EXISTS processing_jobs (
     started_at TIMESTAMP,
     completed_at TIMESTAMP,
     error_message TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY(audio_file_id) REFERENCES audio_files(id)
-);
-
--- Table 5: Processing Results (Metrics)
-CREATE TABLE IF NOT EXISTS processing_results (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    job_id INTEGER NOT NULL,
+    -- Metrics (1:1 with the job, stored inline)
     signal_power REAL,
     noise_power REAL,
     snr_input REAL,
@@ -60,11 +55,12 @@ CREATE TABLE IF NOT EXISTS processing_results (
     segmental_snr REAL,
     processing_duration REAL,
     processed_file_path TEXT,
+    metrics_json TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY(job_id) REFERENCES processing_jobs(id)
+    FOREIGN KEY(audio_file_id) REFERENCES audio_files(id)
 );
 
--- Table 6: Recording Sessions
+-- Table 5: Recording Sessions
 CREATE TABLE IF NOT EXISTS recording_sessions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     recording_id TEXT UNIQUE NOT NULL,
@@ -77,7 +73,7 @@ CREATE TABLE IF NOT EXISTS recording_sessions (
     FOREIGN KEY(user_id) REFERENCES users(id)
 );
 
--- Table 7: Download History
+-- Table 6: Download History
 CREATE TABLE IF NOT EXISTS download_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
@@ -87,7 +83,7 @@ CREATE TABLE IF NOT EXISTS download_history (
     FOREIGN KEY(file_id) REFERENCES audio_files(id)
 );
 
--- Table 8: System Logs
+-- Table 7: System Logs
 CREATE TABLE IF NOT EXISTS system_logs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     log_type TEXT,
@@ -99,6 +95,5 @@ CREATE TABLE IF NOT EXISTS system_logs (
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_user_session ON users(session_id);
 CREATE INDEX IF NOT EXISTS idx_job_status ON processing_jobs(status);
-CREATE INDEX IF NOT EXISTS idx_job_id ON processing_results(job_id);
 CREATE INDEX IF NOT EXISTS idx_audio_session ON audio_files(session_id);
 CREATE INDEX IF NOT EXISTS idx_recording_user ON recording_sessions(user_id);
@@ -0,0 +1,36 @@
+"""
+gunicorn.conf.py - Production server configuration
+Run from the RP_Project directory:
+    gunicorn -c gunicorn.conf.py Backend.App:app
+"""
+
+import multiprocessing
+import os
+
+# Server socket
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}"
+
+# Worker processes (2 x cores + 1), each with a small thread pool for I/O-bound endpoints
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Every worker runs its own pool of PROCESSING_WORKERS pipeline processes. Export the
+# worker count so each pool gives its processes cpu_count // (workers * PROCESSING_WORKERS)
+# FFT threads (at least 1) instead of assuming it has the machine to itself
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+# Heartbeat files on tmpfs so workers are not stalled by disk I/O
+worker_tmp_dir = '/dev/shm'
+
+# Uploads of up to 100MB can take a while on slow links
+timeout = 120
+
+# Each worker imports the app itself so it gets its own engine, log writer
+# thread and processing pool (threads do not survive a preload fork)
+preload_app = False
+
+# Logging
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'INFO').lower()
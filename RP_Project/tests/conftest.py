@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The tests import the backend as the Backend package, like App.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
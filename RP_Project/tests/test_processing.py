@@ -0,0 +1,105 @@
+"""
+test_processing.py - Regression tests for the Processing.py fast paths
+
+The block-streamed and CUDA paths must reproduce the whole-file CPU pipeline.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('librosa')
+sf = pytest.importorskip('soundfile')
+
+from Backend import Processing
+from Backend.Processing import AudioProcessor
+
+SAMPLE_RATE = 16000
+# 16-bit WAV output: allow a couple of quantisation steps of difference
+PCM16_TOLERANCE = 2 / 32768
+
+
+def write_noisy_tone(path, seconds):
+    """Write a reproducible 440 Hz tone plus white noise as a 16 kHz mono WAV"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    audio = 0.5 * np.sin(2 * np.pi * 440 * t) + 0.05 * rng.standard_normal(t.size)
+    sf.write(path, audio.astype(np.float32), SAMPLE_RATE)
+    return str(path)
+
+
+def cuda_available():
+    """Whether CuPy is importable and can see a GPU"""
+    if Processing.cupy is None:
+        return False
+    try:
+        return Processing.cupy.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+
+# ============================================================================
+# BLOCK STREAMING
+# ============================================================================
+def test_process_blocks_matches_whole_file(tmp_path):
+    input_path = write_noisy_tone(tmp_path / 'input.wav', seconds=3)
+
+    whole = AudioProcessor()
+    whole.stream_min_seconds = float('inf')
+    whole_result = whole.process_audio(input_path, str(tmp_path / 'whole.wav'))
+
+    # Short blocks so the 3 s clip spans several of them, including a partial last block
+    blocks = AudioProcessor()
+    blocks.stream_min_seconds = 1
+    blocks.stream_block_seconds = 0.5
+    assert blocks._use_blocks(input_path)
+    blocks_result = blocks.process_audio(input_path, str(tmp_path / 'blocks.wav'))
+
+    assert whole_result['success'] and blocks_result['success']
+
+    whole_audio, _ = sf.read(whole_result['output_path'], dtype='float32')
+    blocks_audio, _ = sf.read(blocks_result['output_path'], dtype='float32')
+    assert blocks_audio.shape == whole_audio.shape
+    np.testing.assert_allclose(blocks_audio, whole_audio, atol=PCM16_TOLERANCE)
+
+    for name, value in whole_result['metrics'].items():
+        if name == 'processing_duration':
+            continue
+        assert blocks_result['metrics'][name] == pytest.approx(value, rel=1e-3, abs=1e-3), name
+
+
+# ============================================================================
+# CUDA DEVICE
+# ============================================================================
+@pytest.mark.skipif(not cuda_available(), reason="CuPy with a CUDA device is required")
+def test_cuda_stft_matches_cpu():
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(SAMPLE_RATE).astype(np.float32)
+
+    cpu = AudioProcessor(device='cpu')
+    gpu = AudioProcessor(device='cuda')
+
+    cpu_stft = cpu._stft(audio)
+    gpu_stft = gpu._stft(audio)
+    np.testing.assert_allclose(Processing.cupy.asnumpy(gpu_stft), cpu_stft, rtol=1e-4, atol=1e-3)
+
+    np.testing.assert_allclose(gpu._istft(gpu_stft), cpu._istft(cpu_stft), atol=1e-5)
+
+
+@pytest.mark.skipif(not cuda_available(), reason="CuPy with a CUDA device is required")
+def test_cuda_pipeline_matches_cpu(tmp_path):
+    input_path = write_noisy_tone(tmp_path / 'input.wav', seconds=2)
+
+    cpu_result = AudioProcessor(device='cpu').process_audio(input_path, str(tmp_path / 'cpu.wav'))
+    gpu_result = AudioProcessor(device='cuda').process_audio(input_path, str(tmp_path / 'gpu.wav'))
+
+    assert cpu_result['success'] and gpu_result['success']
+
+    cpu_audio, _ = sf.read(cpu_result['output_path'], dtype='float32')
+    gpu_audio, _ = sf.read(gpu_result['output_path'], dtype='float32')
+    assert gpu_audio.shape == cpu_audio.shape
+    np.testing.assert_allclose(gpu_audio, cpu_audio, atol=PCM16_TOLERANCE)
+
+    for name, value in cpu_result['metrics'].items():
+        if name == 'processing_duration':
+            continue
+        assert gpu_result['metrics'][name] == pytest.approx(value, rel=1e-3, abs=1e-3), name